@@ -0,0 +1,123 @@
+"""
+Description: This script compares the standard and compact storage layouts.
+It builds a synthetic multi-station database, converts a copy to the compact
+layout, checks that both return the same rows, and reports the on-disk size
+and range-scan times of each.
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+from db_operations import DBOperations
+
+
+def build_database(db_name, stations, start_year, end_year):
+    """
+    Fill a standard-layout database with one record per station per day.
+    Temperatures have one decimal, as published by Environment Canada.
+    """
+    random.seed(0)
+    db = DBOperations(db_name)
+    for station in range(stations):
+        weather_dict = {}
+        day = date(start_year, 1, 1)
+        while day.year <= end_year:
+            mean = round(random.gauss(0, 12), 1)
+            weather_dict[day.isoformat()] = {
+                "Min": round(mean - random.uniform(2, 8), 1),
+                "Max": round(mean + random.uniform(2, 8), 1),
+                "Mean": mean,
+            }
+            day += timedelta(days=1)
+        db.upsert_data(weather_dict, location=f"Station {station:03d}")
+    db.close_connection()
+
+
+def best_times(functions, repeat):
+    """
+    Return the best wall-clock time of several runs of each function, in
+    milliseconds. Runs of the functions alternate so that background load
+    affects them alike, and garbage collection is paused while timing, as
+    timeit does.
+    """
+    best = [float("inf")] * len(functions)
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for index, function in enumerate(functions):
+                start = time.perf_counter()
+                function()
+                best[index] = min(best[index], time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return [value * 1000 for value in best]
+
+
+def main():
+    """
+    Parse arguments, build both databases and print the comparison.
+    """
+    parser = argparse.ArgumentParser(description="Compare standard and compact storage layouts.")
+    parser.add_argument("--stations", type=int, default=20, help="Number of stations")
+    parser.add_argument("--years", type=int, default=20, help="Number of years per station")
+    parser.add_argument("--repeat", type=int, default=15, help="Runs per timing (best is reported)")
+    args = parser.parse_args()
+
+    end_year = 2024
+    start_year = end_year - args.years + 1
+    middle = start_year + args.years // 2
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        standard_name = os.path.join(temp_dir, "standard.db")
+        compact_name = os.path.join(temp_dir, "compact.db")
+        print(f"Building {args.stations} stations x {args.years} years of daily data...")
+        build_database(standard_name, args.stations, start_year, end_year)
+        shutil.copy(standard_name, compact_name)
+
+        start = time.perf_counter()
+        DBOperations(compact_name, compact=True).close_connection()
+        print(f"Converted to the compact layout in {time.perf_counter() - start:.2f}s")
+
+        standard = DBOperations(standard_name, read_only=True)
+        compact = DBOperations(compact_name, read_only=True)
+
+        def strip(rows):
+            # Ids are synthetic in the compact layout
+            return sorted(row[1:] for row in rows)
+
+        if strip(standard.fetch_data()) != strip(compact.fetch_data()):
+            raise SystemExit("Layouts returned different rows")
+
+        scans = [
+            ("Full table", None, None),
+            ("One year", f"{middle}-01-01", f"{middle}-12-31"),
+            ("One month", f"{middle}-07-01", f"{middle}-07-31"),
+        ]
+        print(f"\n{'':24}{'standard':>12}{'compact':>12}")
+        print(f"{'Size on disk (KiB)':24}{os.path.getsize(standard_name) / 1024:12.0f}"
+              f"{os.path.getsize(compact_name) / 1024:12.0f}")
+        for label, start_date, end_date in scans:
+            times = best_times(
+                [lambda db=db: db.fetch_data(start_date, end_date) for db in (standard, compact)],
+                args.repeat
+            )
+            print(f"{label + ' scan (ms)':24}{times[0]:12.2f}{times[1]:12.2f}")
+        times = best_times(
+            [lambda db=db: db.fetch_monthly_averages(f"{middle}-01-01", f"{middle}-12-31")
+             for db in (standard, compact)],
+            args.repeat
+        )
+        print(f"{'One year monthly (ms)':24}{times[0]:12.2f}{times[1]:12.2f}")
+
+        standard.close_connection()
+        compact.close_connection()
+
+
+if __name__ == "__main__":
+    main()
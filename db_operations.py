@@ -3,11 +3,20 @@ Name: Raghav Sharma
 Date: 2025-04-15
 Description: This module handles all database operations including
 initializing the database, saving weather data, fetching data, and purging data.
+Weather data can optionally be partitioned into one SQLite file per year, so
+range queries and retention only touch the years involved, and stored in a
+compact integer-encoded layout.
 """
 
+import os
+import math
+import shutil
 import sqlite3
+import uuid
 import logging
-from datetime import datetime
+from urllib.request import pathname2url
+from datetime import datetime, date
+import weather_analytics
 
 # Configure logging
 logging.basicConfig(
@@ -16,97 +25,919 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+def create_weather_table(cursor):
+    """
+    Create the weather_data table if it doesn't exist and add any columns
+    missing from tables created by earlier versions.
+    :param cursor: Cursor of the database (or partition) to initialize.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS weather_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sample_date TEXT NOT NULL,
+        location TEXT NOT NULL DEFAULT 'Winnipeg',
+        min_temp REAL,
+        max_temp REAL,
+        avg_temp REAL,
+        min_flag TEXT,  -- Data-quality flags: 'E' estimated, 'M' missing
+        max_flag TEXT,
+        avg_flag TEXT,
+        UNIQUE(sample_date, location)  -- Ensures each date-location pair is unique
+    );
+    """)
+
+    # Add the flag columns to tables created before they existed
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(weather_data)")}
+    for column in ("min_flag", "max_flag", "avg_flag"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE weather_data ADD COLUMN {column} TEXT")
+
+
+# Compact layout: day numbers (days since 1970-01-01), a stations dimension
+# table and temperatures in tenths of a degree, in a WITHOUT ROWID table
+# clustered on (station_id, day). The weather_data view keeps the columns of
+# the standard table.
+JULIAN_EPOCH = 2440587.5  # julianday('1970-01-01')
+TEMP_COLUMNS = ("min_temp", "max_temp", "avg_temp")
+FLAG_COLUMNS = ("min_flag", "max_flag", "avg_flag")
+COMPACT_COLUMNS = f"""
+    c.station_id * 100000 + c.day AS id,
+    date(c.day + {JULIAN_EPOCH}) AS sample_date,
+    s.name AS location,
+    c.min_temp / 10.0 AS min_temp,
+    c.max_temp / 10.0 AS max_temp,
+    c.avg_temp / 10.0 AS avg_temp,
+    c.min_flag, c.max_flag, c.avg_flag
+"""
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_day_number(date_str):
+    """
+    Convert a 'YYYY-MM-DD' date into the compact layout's day number.
+    """
+    return date.fromisoformat(date_str).toordinal() - _EPOCH_ORDINAL
+
+
+class _DayStrings(dict):
+    """
+    Cache of 'YYYY-MM-DD' strings by day number, filled on first lookup.
+    """
+
+    def __missing__(self, day):
+        value = self[day] = date.fromordinal(day + _EPOCH_ORDINAL).isoformat()
+        return value
+
+
+# Shared by every compact read; holds one string per distinct day ever read
+_DAY_STRINGS = _DayStrings()
+
+
+def encode_temp(value):
+    """
+    Convert a temperature into tenths of a degree, rounding half away from
+    zero like SQLite's round().
+    """
+    if value is None:
+        return None
+    return int(math.copysign(math.floor(abs(value) * 10 + 0.5), value))
+
+
+def create_compact_tables(cursor):
+    """
+    Create the compact layout (stations, weather_compact and the weather_data
+    compatibility view) if it doesn't exist.
+    :param cursor: Cursor of the database (or partition) to initialize.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stations (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS weather_compact (
+        station_id INTEGER NOT NULL REFERENCES stations (id),
+        day INTEGER NOT NULL,  -- Days since 1970-01-01
+        min_temp INTEGER,      -- Tenths of a degree
+        max_temp INTEGER,
+        avg_temp INTEGER,
+        min_flag TEXT,
+        max_flag TEXT,
+        avg_flag TEXT,
+        PRIMARY KEY (station_id, day)
+    ) WITHOUT ROWID;
+    """)
+    cursor.execute(f"""
+    CREATE VIEW IF NOT EXISTS weather_data AS
+    SELECT {COMPACT_COLUMNS}
+    FROM weather_compact c JOIN stations s ON s.id = c.station_id;
+    """)
+
+
+def convert_to_compact(conn):
+    """
+    Convert a database (or partition) to the compact layout, moving the rows
+    of an existing weather_data table and compacting the file. The conversion
+    runs in one transaction, so a failure leaves the standard table untouched.
+    :param conn: Connection to the database to convert.
+    """
+    cursor = conn.cursor()
+    # sqlite3 only opens transactions implicitly before DML, so the DDL below
+    # would otherwise be committed as it runs
+    conn.commit()
+    cursor.execute("BEGIN")
+    try:
+        has_table = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weather_data'"
+        ).fetchone()
+        if not has_table:
+            create_compact_tables(cursor)
+            conn.commit()
+            return
+
+        create_weather_table(cursor)
+        cursor.execute("ALTER TABLE weather_data RENAME TO weather_data_standard")
+        create_compact_tables(cursor)
+        cursor.execute("INSERT OR IGNORE INTO stations (name) SELECT DISTINCT location FROM weather_data_standard")
+        cursor.execute(f"""
+        INSERT OR REPLACE INTO weather_compact
+            (station_id, day, min_temp, max_temp, avg_temp, min_flag, max_flag, avg_flag)
+        SELECT s.id, CAST(julianday(w.sample_date) - {JULIAN_EPOCH} AS INTEGER),
+               CAST(round(w.min_temp * 10) AS INTEGER),
+               CAST(round(w.max_temp * 10) AS INTEGER),
+               CAST(round(w.avg_temp * 10) AS INTEGER),
+               w.min_flag, w.max_flag, w.avg_flag
+        FROM weather_data_standard w JOIN stations s ON s.name = w.location
+        """)
+        cursor.execute("DROP TABLE weather_data_standard")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    conn.execute("VACUUM")
+
+
+def connect(path, read_only=False):
+    """
+    Open a SQLite connection. Read-only connections may be shared across threads.
+    :param path: Path of the SQLite database file.
+    :param read_only: Open the existing file read-only.
+    :return: sqlite3 connection.
+    """
+    if read_only:
+        uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+    return sqlite3.connect(path)
+
+
 class DBOperations:
     """
     A class to handle database operations for weather data.
     This includes initializing the database, saving data, fetching data,
     and purging data.
+
+    In partitioned mode the main database file keeps the partition catalog and
+    the daily normals, and each year of weather data lives in its own file
+    (e.g. weather_data_2024_1f0c9a2e.db) holding a weather_data table. Every
+    creation of a partition gets a new file name, so connections opened on an
+    earlier file of the same year are recognised as stale. Reads and writes
+    are routed to the partitions covering the requested dates, which are
+    opened on first use.
+
+    Changes committed by other connections (a migration to partitions or to
+    the compact layout, or partitions dropped and created again) are picked up
+    when the main file's data version changes.
+
+    In compact mode weather data is stored in the compact layout, with a
+    weather_data view so the stored rows read the same as before. The layout
+    is detected separately for the main file and for each partition.
     """
 
-    def __init__(self, db_name="weather_data.db"):
+    def __init__(self, db_name="weather_data.db", read_only=False, partitioned=False,
+                 compact=False):
         """
         Initialize the database connection and create the table if it doesn't exist.
         :param db_name: Name of the SQLite database file.
+        :param read_only: Open an existing database read-only without creating tables.
+                          Read-only connections may be shared across threads.
+        :param partitioned: Store weather data in per-year partition files. Existing rows
+                            are moved into partitions. Databases that already have
+                            partitions are always opened in partitioned mode.
+        :param compact: Store weather data in the compact layout. Existing rows are
+                        converted. Compact databases are always opened in compact mode.
         """
         self.db_name = db_name
+        self.read_only = read_only
+        self.partitioned = partitioned
+        self.compact = compact
+        self._partitions = {}  # year -> (file_name, connection)
+        self._compact_stores = set()
+        self._station_ids = {}
+        self._data_version = None
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            self.conn = connect(self.db_name, read_only)
             self.cursor = self.conn.cursor()
-            self.initialize_db()
+            self.partitioned = partitioned or self._has_table("partitions")
+            if read_only:
+                self._detect_layout(self.conn)
+            else:
+                self.initialize_db()
         except sqlite3.Error as e:
             logging.error("Error initializing database connection: %s", e)
 
+    def _has_table(self, name):
+        """
+        Check whether a table exists in the main database file.
+        """
+        return self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
     def initialize_db(self):
         """
-        Create the weather_data table if it doesn't exist.
+        Create the weather_data (or partition catalog) and daily_normals tables
+        if they don't exist.
         """
         try:
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS weather_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sample_date TEXT NOT NULL,
-                location TEXT NOT NULL DEFAULT 'Winnipeg',
-                min_temp REAL,
-                max_temp REAL,
-                avg_temp REAL,
-                UNIQUE(sample_date, location)  -- Ensures each date-location pair is unique
+            create_normals_query = """
+            CREATE TABLE IF NOT EXISTS daily_normals (
+                location TEXT NOT NULL,
+                day_of_year INTEGER NOT NULL,  -- 1-366 on a leap-year calendar
+                mean_temp REAL,
+                p10_temp REAL,
+                p50_temp REAL,
+                p90_temp REAL,
+                sample_count INTEGER NOT NULL,
+                PRIMARY KEY (location, day_of_year)
             );
             """
-            self.cursor.execute(create_table_query)
+            create_catalog_query = """
+            CREATE TABLE IF NOT EXISTS partitions (
+                year INTEGER PRIMARY KEY,
+                file_name TEXT NOT NULL,  -- Relative to the directory of the main database
+                modified_at TEXT NOT NULL
+            );
+            """
+            self.cursor.execute(create_normals_query)
+            if self.partitioned:
+                self.cursor.execute(create_catalog_query)
+                self.conn.commit()
+                if self._has_table("weather_data") or self._has_table("weather_compact"):
+                    self.compact = self.compact or self._has_table("weather_compact")
+                    self.migrate_to_partitions()
+                # New partitions follow the layout of the latest one
+                latest = self.cursor.execute("SELECT MAX(year) FROM partitions").fetchone()[0]
+                if latest is not None and not self.compact:
+                    self.compact = self._partition(latest) in self._compact_stores
+            else:
+                self._prepare_store(self.conn)
+                self.compact = self.conn in self._compact_stores
             self.conn.commit()
+
+            # Backfill the normals for databases created before the table existed
+            has_normals = self.cursor.execute("SELECT 1 FROM daily_normals LIMIT 1").fetchone()
+            if not has_normals and any(
+                conn.execute("SELECT 1 FROM weather_data LIMIT 1").fetchone()
+                for conn in self._stores()
+            ):
+                self.refresh_normals()
         except sqlite3.Error as e:
             logging.error("Error creating table: %s", e)
 
+    def _detect_layout(self, conn):
+        """
+        Record whether a database (or partition) uses the compact layout.
+        :param conn: Connection to the database.
+        """
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weather_compact'"
+        ).fetchone():
+            self._compact_stores.add(conn)
+        else:
+            self._compact_stores.discard(conn)
+
+    def _refresh(self):
+        """
+        Pick up changes committed by other connections since the last call: the
+        storage mode and layouts are detected again, and partitions that were
+        dropped or created again are closed so they are reopened from the catalog.
+        Nothing is read when the main file's data version is unchanged.
+        """
+        version = self.data_version()
+        if version is None or version == self._data_version:
+            return
+        self._data_version = version
+        self.partitioned = self.partitioned or self._has_table("partitions")
+        self._detect_layout(self.conn)
+        if not self.partitioned:
+            return
+        catalog = dict(self.cursor.execute("SELECT year, file_name FROM partitions"))
+        for year, (file_name, conn) in list(self._partitions.items()):
+            if catalog.get(year) != file_name:
+                del self._partitions[year]
+                self._close_store(conn)
+            else:
+                self._detect_layout(conn)
+
+    def _prepare_store(self, conn):
+        """
+        Create the weather storage of a database (or partition) in the requested
+        layout, converting a standard table when compact mode is on. Read-only
+        connections are only inspected.
+        :param conn: Connection to the database.
+        """
+        self._detect_layout(conn)
+        if self.read_only:
+            return
+        if conn in self._compact_stores:
+            create_compact_tables(conn.cursor())
+        elif self.compact:
+            convert_to_compact(conn)
+            self._compact_stores.add(conn)
+        else:
+            create_weather_table(conn.cursor())
+        conn.commit()
+
+    def _close_store(self, conn):
+        """
+        Close a partition connection and forget its cached layout and station ids.
+        """
+        self._compact_stores.discard(conn)
+        for key in [key for key in self._station_ids if key[0] is conn]:
+            del self._station_ids[key]
+        conn.close()
+
+    def _source(self, conn, start_date=None, end_date=None, location=None):
+        """
+        Build a subquery exposing the weather_data columns of a database (or
+        partition) for a date range and location. For compact storage the filters
+        are applied to the clustered (station_id, day) key.
+        :param conn: Connection to the database.
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :param location: Location to select (optional).
+        :return: Tuple (subquery, params).
+        """
+        if conn in self._compact_stores:
+            # Bounding station_id keeps the day range on the primary key
+            conditions = ["c.station_id IN (SELECT id FROM stations{})".format(
+                " WHERE name = ?" if location else "")]
+            params = [location] if location else []
+            if start_date and end_date:
+                conditions.append("c.day BETWEEN ? AND ?")
+                params += [to_day_number(start_date), to_day_number(end_date)]
+            return (f"(SELECT {COMPACT_COLUMNS} FROM weather_compact c "
+                    f"JOIN stations s ON s.id = c.station_id WHERE {' AND '.join(conditions)})",
+                    params)
+
+        conditions, params = [], []
+        if location:
+            conditions.append("location = ?")
+            params.append(location)
+        if start_date and end_date:
+            conditions.append("sample_date BETWEEN ? AND ?")
+            params += [start_date, end_date]
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"(SELECT * FROM weather_data{where})", params
+
+    def _station_id(self, conn, location):
+        """
+        Return the compact layout's id for a station, adding it if it is new.
+        """
+        key = (conn, location)
+        if key not in self._station_ids:
+            conn.execute("INSERT OR IGNORE INTO stations (name) VALUES (?)", (location,))
+            self._station_ids[key] = conn.execute(
+                "SELECT id FROM stations WHERE name = ?", (location,)
+            ).fetchone()[0]
+        return self._station_ids[key]
+
+    def _insert_query(self, conn, columns, ignore=False):
+        """
+        Build the INSERT statement for rows (sample_date, location, *columns).
+        """
+        verb = "INSERT OR IGNORE" if ignore else "INSERT"
+        placeholders = ", ".join("?" * (len(columns) + 2))
+        if conn in self._compact_stores:
+            return f"{verb} INTO weather_compact (station_id, day, {', '.join(columns)}) VALUES ({placeholders})"
+        return f"{verb} INTO weather_data (sample_date, location, {', '.join(columns)}) VALUES ({placeholders})"
+
+    def _update_query(self, conn, columns):
+        """
+        Build the UPDATE statement for rows (*columns, sample_date, location).
+        """
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        if conn in self._compact_stores:
+            return f"UPDATE weather_compact SET {assignments} WHERE station_id = ? AND day = ?"
+        return f"UPDATE weather_data SET {assignments} WHERE sample_date = ? AND location = ?"
+
+    def _encode(self, conn, columns, values):
+        """
+        Convert column values into the storage encoding of a database (or partition).
+        """
+        if conn not in self._compact_stores:
+            return tuple(values)
+        return tuple(encode_temp(value) if column in TEMP_COLUMNS else value
+                     for column, value in zip(columns, values))
+
+    def _key(self, conn, date_str, location):
+        """
+        Return the storage key of a row: (sample_date, location), or
+        (station_id, day) for compact storage.
+        """
+        if conn not in self._compact_stores:
+            return (date_str, location)
+        return (self._station_id(conn, location), to_day_number(date_str))
+
+    def _partition_path(self, file_name):
+        """
+        Return the path of a partition file.
+        """
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_name)), file_name)
+
+    def _partition(self, year, create=False):
+        """
+        Return the connection to a year's partition, opening it on first use.
+        :param year: Year of the partition.
+        :param create: Create the partition if it doesn't exist.
+        :return: sqlite3 connection, or None if the partition doesn't exist.
+        """
+        if year in self._partitions:
+            return self._partitions[year][1]
+        row = self.cursor.execute("SELECT file_name FROM partitions WHERE year = ?", (year,)).fetchone()
+        if row is None:
+            if not create:
+                return None
+            stem, extension = os.path.splitext(os.path.basename(self.db_name))
+            file_name = f"{stem}_{year}_{uuid.uuid4().hex[:8]}{extension or '.db'}"
+            self.cursor.execute(
+                "INSERT INTO partitions (year, file_name, modified_at) VALUES (?, ?, ?)",
+                (year, file_name, datetime.now().isoformat())
+            )
+            self.conn.commit()
+        else:
+            file_name = row[0]
+
+        conn = connect(self._partition_path(file_name), self.read_only)
+        self._prepare_store(conn)
+        self._partitions[year] = (file_name, conn)
+        return conn
+
+    def _partition_years(self, start_date=None, end_date=None):
+        """
+        Return the years of the partitions overlapping a date range.
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :return: Sorted list of years.
+        """
+        years = [row[0] for row in self.cursor.execute("SELECT year FROM partitions ORDER BY year")]
+        if start_date and end_date:
+            years = [year for year in years if int(start_date[:4]) <= year <= int(end_date[:4])]
+        return years
+
+    def _stores(self, start_date=None, end_date=None):
+        """
+        Return the connections holding weather data for a date range: the main
+        connection, or the partitions overlapping the range.
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :return: List of sqlite3 connections.
+        """
+        self._refresh()
+        if not self.partitioned:
+            return [self.conn]
+        return [self._partition(year) for year in self._partition_years(start_date, end_date)]
+
+    def _touch_partitions(self, years):
+        """
+        Record a write to partitions in the catalog, so the main file's data
+        version changes whenever any partition does.
+        :param years: Years of the partitions that were written.
+        """
+        now = datetime.now().isoformat()
+        self.cursor.executemany(
+            "UPDATE partitions SET modified_at = ? WHERE year = ?",
+            [(now, year) for year in years]
+        )
+        self.conn.commit()
+
     def save_data(self, weather_dict):
         """
         Save weather data to the database while ensuring the date is in 'YYYY-MM-DD' format.
+        The daily normals are refreshed for the days of the year that received new rows.
         :param weather_dict: Dictionary containing weather data.
         """
-        insert_query = """
-        INSERT OR IGNORE INTO weather_data (sample_date, location, min_temp, max_temp, avg_temp)
-        VALUES (?, ?, ?, ?, ?);
-        """
+        inserted_dates = []
+        touched = {}
+        self._refresh()
         for date_str, temps in weather_dict.items():
             try:
                 # Ensure the date is stored in 'YYYY-MM-DD' format
                 formatted_date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
-                self.cursor.execute(insert_query, (
-                    formatted_date, "Winnipeg", temps["Min"], temps["Max"], temps["Mean"]
-                ))
+                year = int(formatted_date[:4])
+                conn = self._partition(year, create=True) if self.partitioned else self.conn
+                touched[year] = conn
+                cursor = conn.execute(
+                    self._insert_query(conn, TEMP_COLUMNS, ignore=True),
+                    self._key(conn, formatted_date, "Winnipeg")
+                    + self._encode(conn, TEMP_COLUMNS, (temps["Min"], temps["Max"], temps["Mean"]))
+                )
+                if cursor.rowcount > 0:
+                    inserted_dates.append(formatted_date)
             except ValueError as e:
                 logging.error("Invalid date format for '%s': %s", date_str, e)
             except sqlite3.Error as e:
                 logging.error("Error inserting data into database: %s", e)
         try:
-            self.conn.commit()
+            for conn in set(touched.values()):
+                conn.commit()
+            if self.partitioned and touched:
+                self._touch_partitions(touched)
         except sqlite3.Error as e:
             logging.error("Error committing transaction: %s", e)
+        if inserted_dates:
+            days = weather_analytics.day_of_year(weather_analytics.to_day_numbers(inserted_dates))
+            self.refresh_normals("Winnipeg", set(days.tolist()))
+
+    def upsert_data(self, weather_dict, location="Winnipeg", keep_flags=False):
+        """
+        Save weather data, inserting new days and updating only the days whose
+        values changed (for example revised estimated or missing values).
+        Unchanged days are not written. The daily normals are refreshed for the
+        days of the year that were inserted or updated.
+        :param weather_dict: Dictionary containing weather data, as returned by
+                             WeatherProcessor.transform_data.
+        :param location: Location of the data.
+        :param keep_flags: Also store and compare the data-quality flags ("Flags" entry).
+                           Without it the flags of updated days are cleared, as they
+                           described the previous values.
+        :return: Dictionary with "inserted", "updated" and "unchanged" counts.
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        incoming = {}
+        for date_str, temps in weather_dict.items():
+            try:
+                formatted_date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError as e:
+                logging.error("Invalid date format for '%s': %s", date_str, e)
+                continue
+            values = (temps["Min"], temps["Max"], temps["Mean"])
+            if keep_flags:
+                flags = temps.get("Flags") or {}
+                values += (flags.get("Min"), flags.get("Max"), flags.get("Mean"))
+            incoming[formatted_date] = values
+        if not incoming:
+            return counts
+
+        columns = TEMP_COLUMNS + FLAG_COLUMNS if keep_flags else TEMP_COLUMNS
+        cleared_flags = () if keep_flags else (None,) * len(FLAG_COLUMNS)
+        self._refresh()
+
+        groups = {}
+        for date_str, values in incoming.items():
+            groups.setdefault(int(date_str[:4]) if self.partitioned else None, {})[date_str] = values
+
+        changed_dates = []
+        written = {}
+        try:
+            for year, group in groups.items():
+                conn = self._partition(year, create=True) if self.partitioned else self.conn
+
+                # One range read tells which days are new, changed or unchanged
+                source, params = self._source(conn, min(group), max(group), location)
+                existing = {row[0]: self._encode(conn, columns, row[1:]) for row in conn.execute(
+                    f"SELECT sample_date, {', '.join(columns)} FROM {source}", params
+                )}
+
+                inserts, updates = [], []
+                for date_str, values in group.items():
+                    encoded = self._encode(conn, columns, values)
+                    if date_str not in existing:
+                        inserts.append((date_str, self._key(conn, date_str, location) + encoded))
+                    elif existing[date_str] != encoded:
+                        updates.append((date_str, encoded + cleared_flags + self._key(conn, date_str, location)))
+                counts["inserted"] += len(inserts)
+                counts["updated"] += len(updates)
+                counts["unchanged"] += len(group) - len(inserts) - len(updates)
+                if not inserts and not updates:
+                    continue
+
+                written[year] = conn
+                conn.executemany(self._insert_query(conn, columns), [row for _, row in inserts])
+                conn.executemany(self._update_query(conn, TEMP_COLUMNS + FLAG_COLUMNS),
+                                 [row for _, row in updates])
+                changed_dates += [date_str for date_str, _ in inserts + updates]
+            for conn in written.values():
+                conn.commit()
+            if self.partitioned and written:
+                self._touch_partitions(written)
+        except sqlite3.Error as e:
+            logging.error("Error upserting data into database: %s", e)
+            for conn in written.values():
+                conn.rollback()
+            return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        if changed_dates:
+            days = weather_analytics.day_of_year(weather_analytics.to_day_numbers(changed_dates))
+            self.refresh_normals(location, set(days.tolist()))
+        return counts
 
     def fetch_data(self, start_date=None, end_date=None):
         """
         Retrieve weather data from the database within a given range.
+        Ids are unique across the database but synthetic in partitioned and compact
+        storage: partition rows get year * 1000000000 + row id, and compact rows
+        station id * 100000 + day number.
         :param start_date: Start date in 'YYYY-MM-DD' format (optional).
         :param end_date: End date in 'YYYY-MM-DD' format (optional).
         :return: List of tuples containing weather data.
         """
-        query = "SELECT id, sample_date, location, min_temp, max_temp, avg_temp FROM weather_data"
+        try:
+            rows = []
+            stores = self._stores(start_date, end_date)
+            # Every partition numbers its rows from 1, so the year is folded into the id
+            id_column = ("CAST(substr(sample_date, 1, 4) AS INTEGER) * 1000000000 + id"
+                         if self.partitioned else "id")
+            for conn in stores:
+                if conn in self._compact_stores:
+                    rows += self._fetch_compact(conn, start_date, end_date)
+                    continue
+                source, params = self._source(conn, start_date, end_date)
+                rows += conn.execute(
+                    f"SELECT {id_column}, sample_date, location, min_temp, max_temp, avg_temp FROM {source}",
+                    params
+                ).fetchall()
+            return rows
+        except (sqlite3.Error, ValueError) as e:
+            logging.error("Error fetching data from database: %s", e)
+            return []
+
+    def _fetch_compact(self, conn, start_date=None, end_date=None):
+        """
+        Read fetch_data tuples from compact storage. Day numbers and station ids
+        are decoded in Python, and date strings are cached across calls so each
+        distinct date is built only once.
+        """
+        names = dict(conn.execute("SELECT id, name FROM stations"))
+        query = """
+        SELECT station_id, day, min_temp / 10.0, max_temp / 10.0, avg_temp / 10.0
+        FROM weather_compact
+        """
         params = []
         if start_date and end_date:
-            query += " WHERE sample_date BETWEEN ? AND ?"
-            params = [start_date, end_date]
+            # Bounding station_id keeps the day range on the primary key
+            query += " WHERE station_id IN (SELECT id FROM stations) AND day BETWEEN ? AND ?"
+            params = [to_day_number(start_date), to_day_number(end_date)]
+        dates = _DAY_STRINGS
+        return [
+            (station_id * 100000 + day, dates[day], names[station_id], min_temp, max_temp, avg_temp)
+            for station_id, day, min_temp, max_temp, avg_temp in conn.execute(query, params)
+        ]
+
+    def fetch_monthly_averages(self, start_date=None, end_date=None):
+        """
+        Retrieve monthly temperature aggregates per location within a given range.
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :return: List of tuples (month 'YYYY-MM', location, min_temp, max_temp, avg_temp, day_count).
+        """
+        try:
+            # A month never spans two partitions, so per-partition groups are final
+            rows = []
+            for conn in self._stores(start_date, end_date):
+                source, params = self._source(conn, start_date, end_date)
+                rows += conn.execute(f"""
+                SELECT substr(sample_date, 1, 7) AS month, location,
+                       MIN(min_temp), MAX(max_temp), AVG(avg_temp), COUNT(*)
+                FROM {source}
+                GROUP BY month, location ORDER BY month, location
+                """, params).fetchall()
+            return rows
+        except (sqlite3.Error, ValueError) as e:
+            logging.error("Error fetching monthly averages from database: %s", e)
+            return []
+
+    def data_version(self):
+        """
+        Return SQLite's data version for this connection. The value changes whenever
+        another connection commits a change to the database file. In partitioned mode
+        every write also updates the catalog in the main file, so its version covers
+        all partitions.
+        :return: Integer data version, or None if it cannot be read.
+        """
+        try:
+            return self.cursor.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error("Error reading data version: %s", e)
+            return None
+
+    def refresh_normals(self, location=None, days=None):
+        """
+        Recompute the precomputed daily normals and store them in the daily_normals table.
+        Only the rows for the given location and days of the year are read and rewritten;
+        normals of days left without any temperature are removed.
+        :param location: Location to refresh (optional, defaults to every location).
+        :param days: Iterable of days of the year (1-366) to refresh (optional, defaults to all).
+        """
+        day_filter, month_days = "", []
+        if days:
+            month_days = weather_analytics.month_day_strings(sorted(days))
+            day_filter = f" WHERE substr(sample_date, 6) IN ({', '.join('?' * len(month_days))})"
+        try:
+            rows = []
+            for conn in self._stores():
+                source, params = self._source(conn, location=location)
+                rows += conn.execute(
+                    f"SELECT location, sample_date, avg_temp FROM {source}{day_filter}",
+                    params + month_days
+                ).fetchall()
+            stations = sorted({row[0] for row in rows})
+            lookup = {name: index for index, name in enumerate(stations)}
+            station_idx = [lookup[row[0]] for row in rows]
+            doys = weather_analytics.day_of_year(weather_analytics.to_day_numbers(row[1] for row in rows))
+            temps = [row[2] for row in rows]
+            normals = weather_analytics.compute_normals(station_idx, doys, temps, len(stations))
+
+            refreshed = sorted(days) if days else range(1, weather_analytics.DAYS_IN_YEAR + 1)
+            records = []
+            for index, station in enumerate(stations):
+                for doy in refreshed:
+                    count = int(normals["count"][index, doy - 1])
+                    if count:
+                        records.append((
+                            station, doy,
+                            float(normals["mean"][index, doy - 1]),
+                            float(normals["p10"][index, doy - 1]),
+                            float(normals["p50"][index, doy - 1]),
+                            float(normals["p90"][index, doy - 1]),
+                            count
+                        ))
+            conditions, params = [], []
+            if location:
+                conditions.append("location = ?")
+                params.append(location)
+            if days:
+                conditions.append(f"day_of_year IN ({', '.join('?' * len(refreshed))})")
+                params += refreshed
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            self.cursor.execute(f"DELETE FROM daily_normals{where}", params)
+            self.cursor.executemany("""
+            INSERT OR REPLACE INTO daily_normals
+                (location, day_of_year, mean_temp, p10_temp, p50_temp, p90_temp, sample_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?);
+            """, records)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Error refreshing daily normals: %s", e)
+
+    def fetch_normals(self, location=None):
+        """
+        Retrieve the precomputed daily normals.
+        :param location: Location to fetch (optional, defaults to every location).
+        :return: List of tuples (location, day_of_year, mean_temp, p10_temp, p50_temp, p90_temp, sample_count).
+        """
+        query = """
+        SELECT location, day_of_year, mean_temp, p10_temp, p50_temp, p90_temp, sample_count
+        FROM daily_normals
+        """
+        params = []
+        if location:
+            query += " WHERE location = ?"
+            params = [location]
+        query += " ORDER BY location, day_of_year"
         try:
             self.cursor.execute(query, params)
             return self.cursor.fetchall()
         except sqlite3.Error as e:
-            logging.error("Error fetching data from database: %s", e)
+            logging.error("Error fetching daily normals from database: %s", e)
+            return []
+
+    def list_partitions(self):
+        """
+        Retrieve the partition catalog.
+        :return: List of tuples (year, file_name, modified_at), empty when not partitioned.
+        """
+        self._refresh()
+        if not self.partitioned:
             return []
+        try:
+            self.cursor.execute("SELECT year, file_name, modified_at FROM partitions ORDER BY year")
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            logging.error("Error fetching partitions from database: %s", e)
+            return []
+
+    def drop_partitions(self, before_year=None, archive_dir=None, refresh=True):
+        """
+        Remove whole years of data by deleting (or archiving) their partition files.
+        The cost of the removal depends on the number of partitions removed, not on
+        their size; the daily normals are then recomputed from the remaining years.
+        :param before_year: Drop partitions for years before this one (optional, defaults to all).
+        :param archive_dir: Move the partition files into this directory instead of deleting them.
+        :param refresh: Recompute the daily normals after dropping partitions.
+        :return: List of years removed.
+        """
+        if not self.partitioned:
+            logging.error("drop_partitions requires a partitioned database")
+            return []
+        dropped = []
+        try:
+            for year, file_name, _ in self.list_partitions():
+                if before_year is not None and year >= before_year:
+                    continue
+                if year in self._partitions:
+                    self._close_store(self._partitions.pop(year)[1])
+                self.cursor.execute("DELETE FROM partitions WHERE year = ?", (year,))
+                self.conn.commit()
+
+                path = self._partition_path(file_name)
+                if os.path.exists(path):
+                    if archive_dir:
+                        os.makedirs(archive_dir, exist_ok=True)
+                        shutil.move(path, os.path.join(archive_dir, file_name))
+                    else:
+                        os.remove(path)
+                dropped.append(year)
+        except (sqlite3.Error, OSError) as e:
+            logging.error("Error dropping partitions: %s", e)
+        if dropped and refresh:
+            self.refresh_normals()
+        return dropped
+
+    def migrate_to_partitions(self):
+        """
+        Move the rows of the weather data stored in the main file into
+        per-year partitions, then drop it and compact the main file.
+        """
+        columns = TEMP_COLUMNS + FLAG_COLUMNS
+        try:
+            self._detect_layout(self.conn)
+            if self.conn not in self._compact_stores:
+                create_weather_table(self.cursor)
+                self.conn.commit()
+            years = [int(row[0]) for row in self.cursor.execute(
+                "SELECT DISTINCT substr(sample_date, 1, 4) FROM weather_data"
+            ).fetchall()]
+            for year in years:
+                source, params = self._source(self.conn, f"{year}-01-01", f"{year}-12-31")
+                rows = self.cursor.execute(
+                    f"SELECT sample_date, location, {', '.join(columns)} FROM {source}", params
+                ).fetchall()
+                conn = self._partition(year, create=True)
+                conn.executemany(self._insert_query(conn, columns, ignore=True), [
+                    self._key(conn, row[0], row[1]) + self._encode(conn, columns, row[2:])
+                    for row in rows
+                ])
+                conn.commit()
+
+            if self.conn in self._compact_stores:
+                self.cursor.execute("DROP VIEW weather_data")
+                self.cursor.execute("DROP TABLE weather_compact")
+                self.cursor.execute("DROP TABLE stations")
+                self._compact_stores.discard(self.conn)
+            else:
+                self.cursor.execute("DROP TABLE weather_data")
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+            if years:
+                self._touch_partitions(years)
+        except sqlite3.Error as e:
+            logging.error("Error migrating data to partitions: %s", e)
+
+    def migrate_to_compact(self):
+        """
+        Convert the stored weather data (the main file, or every partition) to the
+        compact layout. New partitions are created in the compact layout too.
+        """
+        if self.read_only:
+            logging.error("migrate_to_compact requires a writable database")
+            return
+        self.compact = True
+        try:
+            for conn in self._stores():
+                if conn not in self._compact_stores:
+                    convert_to_compact(conn)
+                    self._compact_stores.add(conn)
+            if self.partitioned:
+                # Let readers of the main file notice the new layout
+                self._touch_partitions(self._partition_years())
+        except sqlite3.Error as e:
+            logging.error("Error migrating data to the compact layout: %s", e)
 
     def purge_data(self):
         """
         Delete all records while keeping the database structure intact.
+        In partitioned mode every partition file is deleted instead.
         """
         try:
-            self.cursor.execute("DELETE FROM weather_data;")
+            if self.partitioned:
+                self.drop_partitions(refresh=False)
+            elif self.conn in self._compact_stores:
+                self.cursor.execute("DELETE FROM weather_compact;")
+            else:
+                self.cursor.execute("DELETE FROM weather_data;")
+            self.cursor.execute("DELETE FROM daily_normals;")
             self.conn.commit()
             print("All weather data has been deleted.")
         except sqlite3.Error as e:
@@ -114,9 +945,12 @@ class DBOperations:
 
     def close_connection(self):
         """
-        Close the database connection.
+        Close the database connection and any open partitions.
         """
         try:
+            for _, conn in self._partitions.values():
+                self._close_store(conn)
+            self._partitions.clear()
             self.conn.close()
         except sqlite3.Error as e:
             logging.error("Error closing database connection: %s", e)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Description: This script load-tests the weather HTTP service. Without --url it
+starts the service locally on a free port, seeding a temporary database with
+synthetic data when no --db is given, and reports throughput and latency.
+"""
+
+import argparse
+import http.client
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from db_operations import DBOperations
+import weather_service
+
+DEFAULT_PATHS = [
+    "/api/data?start={year}-01-01&end={year}-12-31",
+    "/api/data?start={year}-{month:02d}-01&end={year}-{month:02d}-28",
+    "/api/monthly?start={year}-01-01&end={year}-12-31",
+    "/api/monthly",
+    "/plot/lineplot.png?year={year}&month={month}",
+]
+
+
+def seed_database(db_name, start_year=2000, end_year=2024):
+    """
+    Fill a database with one synthetic record per day.
+    :param db_name: Name of the SQLite database file.
+    """
+    random.seed(0)
+    weather_dict = {}
+    day = date(start_year, 1, 1)
+    while day.year <= end_year:
+        mean = random.gauss(0, 12)
+        weather_dict[day.isoformat()] = {"Min": mean - 5, "Max": mean + 5, "Mean": mean}
+        day += timedelta(days=1)
+    db = DBOperations(db_name)
+    db.save_data(weather_dict)
+    db.close_connection()
+
+
+def worker(host, port, paths, count, results, use_etags):
+    """
+    Issue requests over one keep-alive connection and record latencies.
+    """
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    latencies = []
+    statuses = {}
+    for _ in range(count):
+        path = random.choice(paths)
+        headers = {"Accept-Encoding": "gzip"}
+        if use_etags and path in etags:
+            headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader("ETag"):
+                etags[path] = response.getheader("ETag")
+        except (OSError, http.client.HTTPException):
+            status = "error"
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+    conn.close()
+    results.append((latencies, statuses))
+
+
+def run(host, port, total, concurrency, paths, use_etags):
+    """
+    Run the load test and print a summary.
+    """
+    results = []
+    per_worker = max(1, total // concurrency)
+    threads = [
+        threading.Thread(target=worker, args=(host, port, paths, per_worker, results, use_etags))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    statuses = {}
+    for _, result_statuses in results:
+        for status, count in result_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    def percentile(pct):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000
+
+    print(f"Requests:    {len(latencies)} over {concurrency} connections in {elapsed:.2f}s")
+    print(f"Throughput:  {len(latencies) / elapsed:.0f} requests/s")
+    print(f"Latency ms:  p50={percentile(50):.1f} p95={percentile(95):.1f} p99={percentile(99):.1f}")
+    print("Statuses:    " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+
+
+def main():
+    """
+    Parse arguments, start a local service if needed and run the load test.
+    """
+    parser = argparse.ArgumentParser(description="Load-test the weather HTTP service.")
+    parser.add_argument("--url", help="Base URL of a running service (default: start one locally)")
+    parser.add_argument("--db", help="Database for the local service (default: synthetic data)")
+    parser.add_argument("--requests", type=int, default=5000, help="Total number of requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent connections")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Worker threads of the local service (fewer than connections by default)")
+    parser.add_argument("--no-etags", action="store_true", help="Do not send If-None-Match")
+    args = parser.parse_args()
+
+    paths = [
+        template.format(year=year, month=month)
+        for template in DEFAULT_PATHS
+        for year in (2020, 2021, 2022, 2023)
+        for month in (1, 7)
+    ]
+
+    server = None
+    temp_dir = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        db_name = args.db
+        if not db_name:
+            temp_dir = tempfile.TemporaryDirectory()
+            db_name = os.path.join(temp_dir.name, "load_test.db")
+            print("Seeding a temporary database with synthetic data...")
+            seed_database(db_name)
+        server = weather_service.create_server(db_name, port=0, workers=args.workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        print(f"Started local service on http://{host}:{port} with {args.workers} workers")
+
+    try:
+        run(host, port, args.requests, args.concurrency, paths, not args.no_etags)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+            server.service.close()
+        if temp_dir:
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
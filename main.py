@@ -51,6 +51,36 @@ def scrape_all_data():
         logging.error("Error in scrape_all_data: %s", e)
         print(f"An error occurred: {e}")
 
+def resync_data():
+    """
+    Re-scrape a range of years and write only the days that are new or were
+    revised since they were saved, keeping the data-quality flags.
+    """
+    try:
+        start_year = int(input("Enter first year to re-sync (e.g., 2023): "))
+        end_year = int(input("Enter last year to re-sync (e.g., 2024): "))
+
+        print(f"Re-syncing weather data from {start_year} to {end_year}...")
+        raw_data = fetch_weather_data(start_year, end_year, keep_flags=True)
+        if not raw_data:
+            print("No data fetched.")
+            return
+
+        processor = WeatherProcessor(raw_data)
+        processed_data = processor.transform_data()
+
+        db = DBOperations()
+        counts = db.upsert_data(processed_data, keep_flags=True)
+        db.close_connection()
+        print(f"Inserted {counts['inserted']}, updated {counts['updated']}, "
+              f"unchanged {counts['unchanged']} records.")
+    except ValueError as e:
+        logging.error("Invalid input for re-sync year range: %s", e)
+        print(f"Invalid input: {e}")
+    except Exception as e:
+        logging.error("Error in resync_data: %s", e)
+        print(f"An error occurred: {e}")
+
 def view_boxplot():
     """
     Generate a year-to-year boxplot for weather data within a specified range.
@@ -97,6 +127,59 @@ def view_lineplot():
         logging.error("Error in view_lineplot: %s", e)
         print(f"An error occurred: {e}")
 
+def view_anomaly_plot():
+    """
+    Generate a temperature anomaly plot against the precomputed daily normals
+    for a specified year range.
+    """
+    try:
+        start_year = int(input("Enter start year (e.g., 2023): "))
+        end_year = int(input("Enter end year (e.g., 2024): "))
+
+        db = DBOperations()
+        data = db.fetch_data()
+        normals = db.fetch_normals()
+        db.close_connection()
+
+        if not data:
+            print("No data available for plotting.")
+            return
+
+        plotter = PlotOperations(data)
+        plotter.generate_anomaly_plot(start_year, end_year, normals)
+    except ValueError as e:
+        logging.error("Invalid input for year range: %s", e)
+        print(f"Invalid input: {e}")
+    except Exception as e:
+        logging.error("Error in view_anomaly_plot: %s", e)
+        print(f"An error occurred: {e}")
+
+def view_rolling_mean_plot():
+    """
+    Generate a rolling mean plot for weather data within a specified year range.
+    """
+    try:
+        start_year = int(input("Enter start year (e.g., 2023): "))
+        end_year = int(input("Enter end year (e.g., 2024): "))
+        window = int(input("Enter rolling window in days (e.g., 30): "))
+
+        db = DBOperations()
+        data = db.fetch_data()
+        db.close_connection()
+
+        if not data:
+            print("No data available for plotting.")
+            return
+
+        plotter = PlotOperations(data)
+        plotter.generate_rolling_mean_plot(start_year, end_year, window)
+    except ValueError as e:
+        logging.error("Invalid input for rolling mean plot: %s", e)
+        print(f"Invalid input: {e}")
+    except Exception as e:
+        logging.error("Error in view_rolling_mean_plot: %s", e)
+        print(f"An error occurred: {e}")
+
 def main():
     """
     Main function to display the menu and handle user input.
@@ -107,9 +190,12 @@ def main():
             print("1. Scrape All Available Weather Data")
             print("2. View Weather Trends (Boxplot)")
             print("3. View Monthly Weather (Line Plot)")
-            print("4. Exit")
+            print("4. View Temperature Anomalies")
+            print("5. View Rolling Mean Temperatures")
+            print("6. Re-sync Revised Weather Data")
+            print("7. Exit")
 
-            choice = input("Please enter a number from 1 - 4: ").strip()
+            choice = input("Please enter a number from 1 - 7: ").strip()
 
             if choice == '1':
                 scrape_all_data()
@@ -118,10 +204,16 @@ def main():
             elif choice == '3':
                 view_lineplot()
             elif choice == '4':
+                view_anomaly_plot()
+            elif choice == '5':
+                view_rolling_mean_plot()
+            elif choice == '6':
+                resync_data()
+            elif choice == '7':
                 print("Exiting the program.")
                 break
             else:
-                print("Invalid input. Please enter a number between 1 and 4.")
+                print("Invalid input. Please enter a number between 1 and 7.")
         except Exception as e:
             logging.error("Error in main menu: %s", e)
             print(f"An error occurred: {e}")
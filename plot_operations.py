@@ -5,9 +5,12 @@ Description: This module handles all plotting operations for the weather data.
 """
 
 import logging
+import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from datetime import datetime
 from collections import defaultdict
+from weather_analytics import WeatherAnalytics
 
 # Configure logging
 logging.basicConfig(
@@ -16,18 +19,73 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+def lttb_indices(x, y, threshold):
+    """
+    Select the points to keep with the Largest-Triangle-Three-Buckets algorithm.
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with its neighbours, which preserves
+    peaks and troughs.
+    :param x: Sorted float array of x values.
+    :param y: Float array of y values (no NaN).
+    :param threshold: Number of points to keep.
+    :return: Integer array of selected indices in ascending order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a])
+                       - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(x, y, buckets):
+    """
+    Select the minimum and maximum point of each bucket so extremes are kept.
+    :param x: Sorted float array of x values.
+    :param y: Float array of y values (no NaN).
+    :param buckets: Number of buckets (up to two points are kept per bucket).
+    :return: Integer array of selected indices in ascending order.
+    """
+    n = len(x)
+    if 2 * buckets >= n or buckets < 1:
+        return np.arange(n)
+
+    bucket_ids = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket_ids))
+    counts = np.bincount(bucket_ids, minlength=buckets)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    return np.unique(np.concatenate((order[starts], order[ends - 1], [0, n - 1])))
+
+
 class PlotOperations:
     """
     A class to handle plotting operations for weather data.
     """
 
-    def __init__(self, data):
+    def __init__(self, data, raise_errors=False):
         """
         Initialize with weather data (list of tuples).
         Each tuple: (id, sample_date, location, min_temp, max_temp, avg_temp).
         :param data: List of tuples containing weather data.
+        :param raise_errors: Re-raise plotting errors instead of logging and printing them.
         """
         self.data = data
+        self.raise_errors = raise_errors
+        self._decimated_lines = []
+        self._decimation_method = "lttb"
 
     def generate_year_to_year_boxplot(self, start_year, end_year):
         """
@@ -50,10 +108,12 @@ class PlotOperations:
                 return
 
             # Prepare data for plotting
-            labels = [datetime(1900, month, 1).strftime('%B') for month in range(1, 13)]
-            values = [month_data[month] for month in range(1, 13) if month in month_data]
+            months = [month for month in range(1, 13) if month in month_data]
+            labels = [datetime(1900, month, 1).strftime('%B') for month in months]
+            values = [month_data[month] for month in months]
 
-            plt.boxplot(values, labels=labels)
+            plt.boxplot(values)
+            plt.xticks(range(1, len(months) + 1), labels)
             plt.title(f"Year-to-Year Mean Temperature Distribution ({start_year}-{end_year})")
             plt.xlabel("Month")
             plt.ylabel("Mean Temperature (°C)")
@@ -61,6 +121,8 @@ class PlotOperations:
             plt.tight_layout()
             plt.show()
         except Exception as e:
+            if self.raise_errors:
+                raise
             logging.error("Error in generate_year_to_year_boxplot: %s", e)
             print(f"An error occurred: {e}")
 
@@ -93,5 +155,185 @@ class PlotOperations:
             plt.tight_layout()
             plt.show()
         except Exception as e:
+            if self.raise_errors:
+                raise
             logging.error("Error in generate_lineplot: %s", e)
-            print(f"An error occurred: {e}")
\ No newline at end of file
+            print(f"An error occurred: {e}")
+
+    def generate_anomaly_plot(self, start_year, end_year, normals=None, window=30):
+        """
+        Generate a plot of daily mean temperature anomalies against the daily normals
+        for a given year range, with a rolling mean of the anomalies.
+        :param start_year: Start year for the range.
+        :param end_year: End year for the range.
+        :param normals: Precomputed normals from DBOperations.fetch_normals (optional,
+                        computed from the loaded data when omitted).
+        :param window: Rolling mean window in days.
+        """
+        try:
+            analytics = WeatherAnalytics(self.data, normals)
+            anomalies = analytics.anomalies()
+            start_date, end_date = f"{start_year}-01-01", f"{end_year}-12-31"
+            series = analytics.station_series(anomalies, start_date, end_date)
+
+            if not series:
+                print(f"No data available for the range {start_year}-{end_year}")
+                return
+
+            smoothed = analytics.rolling_means(window, anomalies, start_date, end_date)
+            for station, (days, values) in series.items():
+                dates = days.astype(datetime)
+                if len(series) == 1:
+                    plt.fill_between(dates, values, 0, where=values >= 0,
+                                     color='tab:red', alpha=0.4, interpolate=True)
+                    plt.fill_between(dates, values, 0, where=values < 0,
+                                     color='tab:blue', alpha=0.4, interpolate=True)
+                plt.plot(dates, smoothed[station][1], linewidth=2,
+                         label=f"{station} ({window}-day mean)")
+
+            plt.axhline(0, color='black', linewidth=0.8)
+            plt.title(f"Daily Mean Temperature Anomalies ({start_year}-{end_year})")
+            plt.xlabel("Date")
+            plt.ylabel("Anomaly (°C)")
+            plt.legend()
+            plt.grid(True)
+            plt.tight_layout()
+            plt.show()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            logging.error("Error in generate_anomaly_plot: %s", e)
+            print(f"An error occurred: {e}")
+
+    def generate_rolling_mean_plot(self, start_year, end_year, window=30):
+        """
+        Generate a plot of daily mean temperatures with their rolling mean for a given year range.
+        :param start_year: Start year for the range.
+        :param end_year: End year for the range.
+        :param window: Rolling mean window in days.
+        """
+        try:
+            analytics = WeatherAnalytics(self.data)
+            start_date, end_date = f"{start_year}-01-01", f"{end_year}-12-31"
+            series = analytics.station_series(None, start_date, end_date)
+
+            if not series:
+                print(f"No data available for the range {start_year}-{end_year}")
+                return
+
+            smoothed = analytics.rolling_means(window, None, start_date, end_date)
+            for station, (days, values) in series.items():
+                dates = days.astype(datetime)
+                line, = plt.plot(dates, values, linewidth=0.6, alpha=0.4)
+                plt.plot(dates, smoothed[station][1], linewidth=2, color=line.get_color(),
+                         label=f"{station} ({window}-day mean)")
+
+            plt.title(f"Daily Mean Temperatures with {window}-Day Rolling Mean ({start_year}-{end_year})")
+            plt.xlabel("Date")
+            plt.ylabel("Mean Temperature (°C)")
+            plt.legend()
+            plt.grid(True)
+            plt.tight_layout()
+            plt.show()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            logging.error("Error in generate_rolling_mean_plot: %s", e)
+            print(f"An error occurred: {e}")
+
+    def generate_longrange_lineplot(self, start_date=None, end_date=None, locations=None,
+                                    method="lttb"):
+        """
+        Generate a continuous line plot of daily mean temperatures over any span,
+        with one line per station. Each line is decimated to the pixel width of the
+        axes, and is re-decimated from the full-resolution data whenever the view
+        is zoomed, panned or resized, so render time stays nearly constant.
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :param locations: List of stations to plot (optional, defaults to every station).
+        :param method: Decimation method, "lttb" or "minmax".
+        """
+        try:
+            if method not in ("lttb", "minmax"):
+                raise ValueError(f"Unknown decimation method: {method}")
+
+            series = WeatherAnalytics(self.data).station_series(None, start_date, end_date)
+            if locations:
+                series = {station: values for station, values in series.items() if station in locations}
+
+            if not series:
+                print(f"No data available for the range {start_date or 'start'} to {end_date or 'end'}")
+                return
+
+            plt.clf()
+            ax = plt.gca()
+            self._decimation_method = method
+            self._decimated_lines = []
+            for station, (days, values) in series.items():
+                valid = ~np.isnan(values)
+                x = mdates.date2num(days[valid])
+                y = values[valid]
+                line, = ax.plot(x, y, linewidth=1, label=station)
+                self._decimated_lines.append((line, x, y))
+
+            ax.xaxis_date()
+            ax.set_title("Daily Mean Temperatures")
+            ax.set_xlabel("Date")
+            ax.set_ylabel("Mean Temperature (°C)")
+            ax.legend()
+            ax.grid(True)
+            plt.tight_layout()
+
+            self._redecimate(ax)
+            ax.callbacks.connect("xlim_changed", self._redecimate)
+            # Figures are reused between plots and clf() keeps canvas callbacks,
+            # so replace the resize handler of an earlier long-range plot
+            figure = ax.figure
+            previous = getattr(figure, "_longrange_resize_cid", None)
+            if previous is not None:
+                figure.canvas.mpl_disconnect(previous)
+            figure._longrange_resize_cid = figure.canvas.mpl_connect(
+                "resize_event", lambda event: self._on_resize(ax))
+            plt.show()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            logging.error("Error in generate_longrange_lineplot: %s", e)
+            print(f"An error occurred: {e}")
+
+    def _on_resize(self, ax):
+        """
+        Re-decimate after a resize, or disconnect the handler once the axes
+        has been removed from its figure by a later plot.
+        :param ax: Axes holding the long-range lines.
+        """
+        figure = ax.figure
+        if ax not in figure.axes:
+            figure.canvas.mpl_disconnect(figure._longrange_resize_cid)
+            figure._longrange_resize_cid = None
+            self._decimated_lines = []
+            return
+        self._redecimate(ax)
+
+    def _redecimate(self, ax):
+        """
+        Re-decimate every long-range line from its full-resolution data for the
+        visible x range and the current pixel width of the axes.
+        :param ax: Axes holding the long-range lines.
+        """
+        try:
+            width = max(int(ax.get_window_extent().width), 3)
+            x_min, x_max = ax.get_xlim()
+            for line, x, y in self._decimated_lines:
+                # Keep one point beyond each edge so lines run to the border
+                start = max(int(np.searchsorted(x, x_min)) - 1, 0)
+                end = min(int(np.searchsorted(x, x_max, side="right")) + 1, len(x))
+                visible_x, visible_y = x[start:end], y[start:end]
+                if self._decimation_method == "minmax":
+                    keep = minmax_indices(visible_x, visible_y, width // 2)
+                else:
+                    keep = lttb_indices(visible_x, visible_y, width)
+                line.set_data(visible_x[keep], visible_y[keep])
+            ax.figure.canvas.draw_idle()
+        except Exception as e:
+            logging.error("Error in _redecimate: %s", e)
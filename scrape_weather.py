@@ -21,15 +21,21 @@ class WeatherScraper(HTMLParser):
     A class to parse weather data from HTML content.
     """
 
-    def __init__(self, year, month):
+    def __init__(self, year, month, keep_flags=False):
         """
         Initialize the WeatherScraper with the year and month to scrape.
         :param year: Year of the data to scrape.
         :param month: Month of the data to scrape.
+        :param keep_flags: Record the data-quality flags ("E" estimated, "M" missing)
+                           attached to each temperature.
         """
         super().__init__()
         self.year = year
         self.month = month
+        self.keep_flags = keep_flags
+        self.current_flags = {}
+        self.cell_start = 0
+        self.cell_flag = None
         self.in_table = False
         self.in_row = False
         self.current_data = []
@@ -47,8 +53,11 @@ class WeatherScraper(HTMLParser):
             elif self.in_table and tag == "tr":
                 self.in_row = True
                 self.current_data = []
+                self.current_flags = {}
             elif self.in_table and tag in ["th", "td"]:
                 self.capture_data = True
+                self.cell_start = len(self.current_data)
+                self.cell_flag = None
             self.current_tag = tag
         except Exception as e:
             logging.error("Error in handle_starttag: %s", e)
@@ -62,6 +71,9 @@ class WeatherScraper(HTMLParser):
                 cleaned_data = data.strip()
                 if cleaned_data and cleaned_data not in ["LegendM", "M", "LegendE", "E"]:
                     self.current_data.append(cleaned_data)
+                elif cleaned_data:
+                    # A flag qualifies the value of its cell; a missing value has none
+                    self.cell_flag = cleaned_data[-1]
         except Exception as e:
             logging.error("Error in handle_data: %s", e)
 
@@ -72,6 +84,12 @@ class WeatherScraper(HTMLParser):
         try:
             if tag in ["th", "td"]:
                 self.capture_data = False
+                if self.cell_flag:
+                    if len(self.current_data) == self.cell_start:
+                        # Keep the columns aligned when the cell holds only a flag
+                        self.current_data.append("-")
+                    if self.keep_flags:
+                        self.current_flags[len(self.current_data) - 1] = self.cell_flag
             elif tag == "tr" and self.in_row:
                 self.in_row = False
                 if len(self.current_data) >= 5:
@@ -79,12 +97,19 @@ class WeatherScraper(HTMLParser):
                         day = self.current_data[0].zfill(2)
                         full_date = f"{self.year}-{self.month:02d}-{day}"
 
-                        self.weather_data.append({
+                        record = {
                             "date": full_date,
                             "max_temp": float(self.current_data[1]) if self.current_data[1] != "-" else None,
                             "min_temp": float(self.current_data[2]) if self.current_data[2] != "-" else None,
                             "mean_temp": float(self.current_data[3]) if self.current_data[3] != "-" else None,
-                        })
+                        }
+                        if self.keep_flags:
+                            record["flags"] = {
+                                "max_temp": self.current_flags.get(1),
+                                "min_temp": self.current_flags.get(2),
+                                "mean_temp": self.current_flags.get(3),
+                            }
+                        self.weather_data.append(record)
                     except ValueError as e:
                         logging.error("Error parsing row data: %s", e)
             elif tag == "table":
@@ -100,18 +125,21 @@ class WeatherScraper(HTMLParser):
         return self.weather_data
 
 
-def fetch_weather_data():
+def fetch_weather_data(start_year=2020, end_year=None, keep_flags=False):
     """
-    Fetch weather data from 2020 to the current date.
+    Fetch weather data from the start year to the end year (or the current date).
+    :param start_year: First year to fetch.
+    :param end_year: Last year to fetch (optional, defaults to the current year).
+    :param keep_flags: Include the data-quality flags of each temperature.
     :return: List of weather data dictionaries.
     """
     try:
-        start_year = 2020
         current_year = datetime.now().year
         current_month = datetime.now().month
+        end_year = min(end_year or current_year, current_year)
         all_weather_data = []
 
-        for year in range(start_year, current_year + 1):
+        for year in range(start_year, end_year + 1):
             for month in range(1, 13):
                 if year == current_year and month > current_month:
                     break  # Stop if the month is beyond the current month in the current year
@@ -132,7 +160,7 @@ def fetch_weather_data():
                 try:
                     response = requests.get(full_url)
                     if response.status_code == 200:
-                        parser = WeatherScraper(year, month)
+                        parser = WeatherScraper(year, month, keep_flags)
                         parser.feed(response.text)
                         monthly_data = parser.get_weather_data()
                         if monthly_data:
@@ -0,0 +1,241 @@
+"""
+Description: This module computes climatology analytics for the weather data,
+including daily normals, anomaly series and rolling averages, using vectorized
+NumPy array operations.
+"""
+
+import numpy as np
+
+# Days of the year are counted on a leap-year calendar so that 29 February
+# always has its own slot (1 = 1 January, 60 = 29 February, 366 = 31 December).
+DAYS_IN_YEAR = 366
+NORMAL_PERCENTILES = (10, 50, 90)
+_MONTH_OFFSETS = np.array([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335])
+
+
+def to_day_numbers(date_strings):
+    """
+    Convert 'YYYY-MM-DD' strings into a NumPy datetime64[D] array.
+    :param date_strings: Iterable of date strings.
+    :return: Array of datetime64[D] values.
+    """
+    return np.array(list(date_strings), dtype="datetime64[D]")
+
+
+def day_of_year(days):
+    """
+    Compute the day of the year (1-366, leap-year calendar) for each date.
+    :param days: Array of datetime64[D] values.
+    :return: Integer array of days of the year.
+    """
+    months = days.astype("datetime64[M]")
+    month_index = months.astype(np.int64) % 12
+    day_of_month = (days - months.astype("datetime64[D]")).astype(np.int64) + 1
+    return _MONTH_OFFSETS[month_index] + day_of_month
+
+
+def month_day_strings(doys):
+    """
+    Convert days of the year back into 'MM-DD' strings.
+    :param doys: Iterable of days of the year (1-366).
+    :return: List of 'MM-DD' strings.
+    """
+    # 2000 is a leap year, so every slot of the leap-year calendar exists.
+    base = np.datetime64("2000-01-01")
+    return [str(base + int(doy) - 1)[5:] for doy in doys]
+
+
+def compute_normals(station_idx, doys, temps, n_stations, percentiles=NORMAL_PERCENTILES):
+    """
+    Compute daily normals per station and day of the year in a single pass.
+    Missing temperatures (NaN) are ignored.
+    :param station_idx: Integer array of station indices (0 to n_stations - 1).
+    :param doys: Integer array of days of the year (1-366).
+    :param temps: Float array of temperatures.
+    :param n_stations: Number of stations.
+    :param percentiles: Percentiles to compute for each day of the year.
+    :return: Dictionary with "mean", "count" and "p<N>" arrays of shape (n_stations, 366).
+    """
+    shape = (n_stations, DAYS_IN_YEAR)
+    temps = np.asarray(temps, dtype=float)
+    valid = ~np.isnan(temps)
+    keys = (np.asarray(station_idx, dtype=np.int64)[valid] * DAYS_IN_YEAR
+            + (np.asarray(doys, dtype=np.int64)[valid] - 1))
+    values = temps[valid]
+
+    counts = np.bincount(keys, minlength=n_stations * DAYS_IN_YEAR)
+    sums = np.bincount(keys, weights=values, minlength=n_stations * DAYS_IN_YEAR)
+    has_data = counts > 0
+
+    normals = {
+        "count": counts.reshape(shape),
+        "mean": np.divide(sums, counts, out=np.full(counts.shape, np.nan),
+                          where=has_data).reshape(shape),
+    }
+
+    # Sort by (group, value) once; each group's values are then a contiguous
+    # ascending run, so percentiles are plain index arithmetic (linear interpolation).
+    order = np.lexsort((values, keys))
+    sorted_values = values[order]
+    starts = np.cumsum(counts) - counts
+    last = np.maximum(counts - 1, 0)
+    for pct in percentiles:
+        position = last * (pct / 100.0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        fraction = position - lower
+        result = np.full(counts.shape, np.nan)
+        if sorted_values.size:
+            low_values = sorted_values[np.minimum(starts + lower, sorted_values.size - 1)]
+            high_values = sorted_values[np.minimum(starts + upper, sorted_values.size - 1)]
+            interpolated = low_values + (high_values - low_values) * fraction
+            result[has_data] = interpolated[has_data]
+        normals[f"p{pct}"] = result.reshape(shape)
+    return normals
+
+
+def compute_anomalies(station_idx, doys, temps, normal_mean):
+    """
+    Compute the departure of each temperature from its daily normal.
+    :param station_idx: Integer array of station indices.
+    :param doys: Integer array of days of the year (1-366).
+    :param temps: Float array of temperatures.
+    :param normal_mean: Array of shape (n_stations, 366) with the normal means.
+    :return: Float array of anomalies (NaN where no normal is available).
+    """
+    return np.asarray(temps, dtype=float) - normal_mean[station_idx, np.asarray(doys) - 1]
+
+
+def to_daily_grid(days, values):
+    """
+    Place a series onto a continuous daily grid so that missing days become NaN.
+    :param days: Sorted array of datetime64[D] values without duplicates.
+    :param values: Float array of values matching days.
+    :return: Tuple (grid_days, grid_values).
+    """
+    if days.size == 0:
+        return days, np.asarray(values, dtype=float)
+    grid_days = np.arange(days[0], days[-1] + 1, dtype="datetime64[D]")
+    grid_values = np.full(grid_days.size, np.nan)
+    grid_values[(days - days[0]).astype(np.int64)] = values
+    return grid_days, grid_values
+
+
+def rolling_mean(values, window, min_periods=None):
+    """
+    Compute a trailing rolling mean that skips missing values (NaN).
+    :param values: Float array of evenly spaced values.
+    :param window: Window length in samples.
+    :param min_periods: Minimum number of valid samples in a window (defaults to half the window).
+    :return: Float array of rolling means (NaN where too few samples are available).
+    """
+    values = np.asarray(values, dtype=float)
+    if min_periods is None:
+        min_periods = max(1, window // 2)
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    upper = np.arange(1, values.size + 1)
+    lower = np.maximum(upper - window, 0)
+    window_sums = sums[upper] - sums[lower]
+    window_counts = counts[upper] - counts[lower]
+    return np.divide(window_sums, window_counts, out=np.full(values.size, np.nan),
+                     where=window_counts >= min_periods)
+
+
+class WeatherAnalytics:
+    """
+    A class to compute climatology analytics (daily normals, anomalies and
+    rolling averages) for weather data.
+    """
+
+    def __init__(self, data, normals=None):
+        """
+        Initialize with weather data (list of tuples) and optional precomputed normals.
+        Each data tuple: (id, sample_date, location, min_temp, max_temp, avg_temp).
+        Each normals tuple: (location, day_of_year, mean_temp, p10_temp, p50_temp, p90_temp, sample_count).
+        :param data: List of tuples containing weather data.
+        :param normals: List of tuples as returned by DBOperations.fetch_normals (optional).
+        """
+        self.stations = sorted({record[2] for record in data})
+        lookup = {name: index for index, name in enumerate(self.stations)}
+        self.station_idx = np.array([lookup[record[2]] for record in data], dtype=np.int64)
+        self.days = to_day_numbers(record[1] for record in data)
+        self.temps = np.array([record[5] for record in data], dtype=float)
+        self.doys = day_of_year(self.days)
+        self._normal_mean = self._normals_from_rows(normals) if normals else None
+
+    def _normals_from_rows(self, rows):
+        """
+        Build the normal mean matrix from rows of the daily_normals table.
+        :param rows: List of normals tuples.
+        :return: Array of shape (n_stations, 366).
+        """
+        normal_mean = np.full((len(self.stations), DAYS_IN_YEAR), np.nan)
+        lookup = {name: index for index, name in enumerate(self.stations)}
+        for location, doy, mean_temp, *_ in rows:
+            if location in lookup and mean_temp is not None:
+                normal_mean[lookup[location], doy - 1] = mean_temp
+        return normal_mean
+
+    def daily_normals(self):
+        """
+        Compute daily normals for every station from the loaded data.
+        :return: Dictionary of arrays of shape (n_stations, 366), see compute_normals.
+        """
+        return compute_normals(self.station_idx, self.doys, self.temps, len(self.stations))
+
+    def normal_mean(self):
+        """
+        Return the normal mean per station and day of the year, computing it if not precomputed.
+        :return: Array of shape (n_stations, 366).
+        """
+        if self._normal_mean is None:
+            self._normal_mean = self.daily_normals()["mean"]
+        return self._normal_mean
+
+    def anomalies(self):
+        """
+        Compute the anomaly of every loaded record against the daily normals.
+        :return: Float array of anomalies aligned with the loaded data.
+        """
+        return compute_anomalies(self.station_idx, self.doys, self.temps, self.normal_mean())
+
+    def station_series(self, values=None, start_date=None, end_date=None):
+        """
+        Split a per-record array into continuous daily series for each station.
+        :param values: Float array aligned with the loaded data (defaults to the temperatures).
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :return: Dictionary {station: (grid_days, grid_values)}.
+        """
+        values = self.temps if values is None else values
+        mask = np.ones(self.days.size, dtype=bool)
+        if start_date:
+            mask &= self.days >= np.datetime64(start_date)
+        if end_date:
+            mask &= self.days <= np.datetime64(end_date)
+
+        series = {}
+        for index, station in enumerate(self.stations):
+            selected = mask & (self.station_idx == index)
+            order = np.argsort(self.days[selected], kind="stable")
+            days = self.days[selected][order]
+            if days.size:
+                series[station] = to_daily_grid(days, values[selected][order])
+        return series
+
+    def rolling_means(self, window=30, values=None, start_date=None, end_date=None):
+        """
+        Compute rolling means of a per-record array for each station.
+        :param window: Window length in days.
+        :param values: Float array aligned with the loaded data (defaults to the temperatures).
+        :param start_date: Start date in 'YYYY-MM-DD' format (optional).
+        :param end_date: End date in 'YYYY-MM-DD' format (optional).
+        :return: Dictionary {station: (grid_days, rolling_values)}.
+        """
+        return {
+            station: (days, rolling_mean(grid_values, window))
+            for station, (days, grid_values)
+            in self.station_series(values, start_date, end_date).items()
+        }
@@ -33,6 +33,8 @@ class WeatherProcessor:
             "YYYY-MM-DD": {"Min": float or None, "Max": float or None, "Mean": float or None},
             ...
         }
+        Entries scraped with data-quality flags also get a "Flags" dictionary
+        with the same keys holding "E", "M" or None.
         :return: Dictionary of cleaned weather data.
         """
         processed_data = {}
@@ -54,6 +56,14 @@ class WeatherProcessor:
                     "Mean": float(mean_temp) if mean_temp is not None else None,
                 }
 
+                flags = entry.get("flags")
+                if flags is not None:
+                    processed_data[date_str]["Flags"] = {
+                        "Min": flags.get("min_temp"),
+                        "Max": flags.get("max_temp"),
+                        "Mean": flags.get("mean_temp"),
+                    }
+
             except (ValueError, TypeError) as e:
                 logging.error("Skipping invalid entry %s: %s", entry, e)
                 print(f"Skipping invalid entry {entry}: {e}")
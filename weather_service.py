@@ -0,0 +1,498 @@
+"""
+Description: This module serves the weather database over a local, read-only
+HTTP/JSON interface: range queries, monthly aggregates and rendered plot images.
+Each connection gets its own thread, the database and rendering work runs on
+a fixed-size thread pool over pooled read-only connections, and responses are cached and tagged (ETag) against the database's data version.
+"""
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import warnings
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qs
+
+import matplotlib
+matplotlib.use("Agg")  # Render plots off-screen; must be selected before pyplot is imported
+import matplotlib.pyplot as plt
+
+from db_operations import DBOperations
+from plot_operations import PlotOperations
+
+# Configure logging
+logging.basicConfig(
+    filename="weather_service.log",
+    level=logging.ERROR,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+GZIP_MIN_SIZE = 512
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Check whether an Accept-Encoding header allows gzip. A quality of zero
+    (e.g. "gzip;q=0") refuses it, and an explicit gzip entry overrides "*".
+    :param accept_encoding: Value of the Accept-Encoding header.
+    :return: True if a gzip response is acceptable.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against an entity tag, using the weak
+    comparison that If-None-Match requires.
+    :param if_none_match: Value of the If-None-Match header.
+    :param etag: Quoted entity tag of the current representation.
+    :return: True if the client's copy is current.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ServiceError(Exception):
+    """
+    An error that is reported to the client with an HTTP status code.
+    """
+
+    def __init__(self, status, message):
+        """
+        :param status: HTTP status code.
+        :param message: Error message returned to the client.
+        """
+        super().__init__(message)
+        self.status = status
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of read-only DBOperations connections.
+    """
+
+    def __init__(self, db_name, size):
+        """
+        Open the pooled connections.
+        :param db_name: Name of the SQLite database file.
+        :param size: Number of connections in the pool.
+        """
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(DBOperations(db_name, read_only=True))
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with-block.
+        """
+        db = self._connections.get()
+        try:
+            yield db
+        finally:
+            self._connections.put(db)
+
+    def close(self):
+        """
+        Close every pooled connection.
+        """
+        while not self._connections.empty():
+            self._connections.get_nowait().close_connection()
+
+
+class WeatherService:
+    """
+    A class that answers weather queries, caching each response until the
+    database's data version changes.
+    """
+
+    def __init__(self, db_name="weather_data.db", pool_size=8, cache_size=256):
+        """
+        Initialize the connection pool, the version tracker and the response cache.
+        :param db_name: Name of the SQLite database file (must already exist).
+        :param pool_size: Number of pooled read-only connections.
+        :param cache_size: Maximum number of cached responses.
+        """
+        if not os.path.exists(db_name):
+            raise FileNotFoundError(f"Database not found: {db_name}")
+        self.pool = ConnectionPool(db_name, pool_size)
+        self._version_db = DBOperations(db_name, read_only=True)
+        self._version_lock = threading.Lock()
+        self._last_data_version = self._version_db.data_version()
+        # The process start time keeps tags from a previous run from matching
+        self._generation = 0
+        self._run_id = format(int(datetime.now().timestamp()), "x")
+
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        self._key_locks = {}  # one builder per cache key; concurrent misses wait for it
+        self._plot_lock = threading.Lock()  # pyplot keeps global state
+
+        self.routes = {
+            "/api/data": self.query_data,
+            "/api/monthly": self.query_monthly,
+            "/plot/boxplot.png": self.plot_boxplot,
+            "/plot/lineplot.png": self.plot_lineplot,
+            "/plot/longrange.png": self.plot_longrange,
+        }
+
+    def current_version(self):
+        """
+        Return the current data version tag, dropping the cache if the database changed.
+        :return: Version tag string.
+        """
+        with self._version_lock:
+            data_version = self._version_db.data_version()
+            if data_version != self._last_data_version:
+                self._last_data_version = data_version
+                self._generation += 1
+                with self._cache_lock:
+                    self._cache.clear()
+            return f"{self._run_id}.{self._generation}"
+
+    def get(self, path, query):
+        """
+        Return the response for a request, from the cache when possible.
+        :param path: Request path.
+        :param query: Raw query string.
+        :return: Tuple (etag, content_type, body, gzipped_body or None).
+        """
+        if path not in self.routes:
+            raise ServiceError(404, f"Unknown path: {path}")
+        version = self.current_version()
+        key = f"{path}?{query}"
+        cached = self._cached(key, version)
+        if cached is not None:
+            return cached
+
+        with self._cache_lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self._cached(key, version)
+            if cached is not None:
+                return cached
+            try:
+                return self._build(path, query, key, version)
+            finally:
+                with self._cache_lock:
+                    self._key_locks.pop(key, None)
+
+    def _cached(self, key, version):
+        """
+        Return the cached response for a key if it belongs to the given version.
+        """
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(key)
+                return cached[1:]
+        return None
+
+    def _build(self, path, query, key, version):
+        """
+        Build a response and store it in the cache.
+        """
+        params = {name: values[-1] for name, values in parse_qs(query).items()}
+        content_type, body = self.routes[path](params)
+        etag = f'"{version}-{zlib.crc32(key.encode()):08x}"'
+        gzipped = None
+        if content_type == "application/json" and len(body) >= GZIP_MIN_SIZE:
+            gzipped = gzip.compress(body, compresslevel=5)
+        entry = (version, etag, content_type, body, gzipped)
+        with self._cache_lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return entry[1:]
+
+    @staticmethod
+    def _date_param(params, name):
+        """
+        Read an optional 'YYYY-MM-DD' query parameter.
+        """
+        value = params.get(name)
+        if value is None:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            raise ServiceError(400, f"Invalid date for '{name}': {value}")
+
+    @staticmethod
+    def _int_param(params, name):
+        """
+        Read a required integer query parameter.
+        """
+        try:
+            return int(params[name])
+        except KeyError:
+            raise ServiceError(400, f"Missing parameter: {name}")
+        except ValueError:
+            raise ServiceError(400, f"Invalid integer for '{name}': {params[name]}")
+
+    def _date_range(self, params):
+        """
+        Read the start/end query parameters; both are required together.
+        """
+        start_date = self._date_param(params, "start")
+        end_date = self._date_param(params, "end")
+        if bool(start_date) != bool(end_date):
+            raise ServiceError(400, "Both 'start' and 'end' are required for a range")
+        return start_date, end_date
+
+    @staticmethod
+    def _json(payload):
+        """
+        Encode a payload as compact JSON.
+        """
+        return "application/json", json.dumps(payload, separators=(",", ":")).encode()
+
+    def query_data(self, params):
+        """
+        Daily records within an optional date range.
+        """
+        start_date, end_date = self._date_range(params)
+        with self.pool.connection() as db:
+            rows = db.fetch_data(start_date, end_date)
+        return self._json([
+            {"date": row[1], "location": row[2], "min_temp": row[3],
+             "max_temp": row[4], "avg_temp": row[5]}
+            for row in rows
+        ])
+
+    def query_monthly(self, params):
+        """
+        Monthly aggregates within an optional date range.
+        """
+        start_date, end_date = self._date_range(params)
+        with self.pool.connection() as db:
+            rows = db.fetch_monthly_averages(start_date, end_date)
+        return self._json([
+            {"month": row[0], "location": row[1], "min_temp": row[2],
+             "max_temp": row[3], "avg_temp": row[4], "days": row[5]}
+            for row in rows
+        ])
+
+    def _render(self, draw):
+        """
+        Run a PlotOperations method on a fresh figure and return it as a PNG.
+        Plotting errors are raised (and answered with 500) rather than printed.
+        :param draw: Callable taking a PlotOperations instance.
+        """
+        with self.pool.connection() as db:
+            data = db.fetch_data()
+        with self._plot_lock:
+            figure = plt.figure(figsize=(10, 6))
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")  # plt.show() is a no-op under Agg
+                    draw(PlotOperations(data, raise_errors=True))
+                if not any(ax.has_data() for ax in figure.axes):
+                    raise ServiceError(404, "No data available for the requested plot")
+                buffer = io.BytesIO()
+                figure.savefig(buffer, format="png")
+            finally:
+                plt.close(figure)
+        return "image/png", buffer.getvalue()
+
+    def plot_boxplot(self, params):
+        """
+        Year-to-year boxplot image for start_year..end_year.
+        """
+        start_year = self._int_param(params, "start_year")
+        end_year = self._int_param(params, "end_year")
+        return self._render(lambda plot: plot.generate_year_to_year_boxplot(start_year, end_year))
+
+    def plot_lineplot(self, params):
+        """
+        Monthly line plot image for year/month.
+        """
+        year = self._int_param(params, "year")
+        month = self._int_param(params, "month")
+        return self._render(lambda plot: plot.generate_lineplot(year, month))
+
+    def plot_longrange(self, params):
+        """
+        Long-range line plot image within an optional date range.
+        """
+        start_date, end_date = self._date_range(params)
+        return self._render(lambda plot: plot.generate_longrange_lineplot(start_date, end_date))
+
+    def close(self):
+        """
+        Close the pooled and version-tracking connections.
+        """
+        self.pool.close()
+        self._version_db.close_connection()
+
+
+class WeatherRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler translating GET requests into WeatherService calls.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY keep-alive
+    # responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+    # Idle keep-alive connections are closed so their threads don't pile up
+    timeout = 30
+
+    def do_GET(self):
+        """
+        Serve a GET request, answering 304 when the client's ETag is current.
+        The service call runs on the server's worker pool.
+        """
+        url = urlsplit(self.path)
+        try:
+            etag, content_type, body, gzipped = self.server.executor.submit(
+                self.server.service.get, url.path, url.query
+            ).result()
+        except ServiceError as e:
+            self._send(e.status, "application/json", json.dumps({"error": str(e)}).encode())
+            return
+        except Exception:
+            logging.exception("Error handling %s", self.path)
+            self._send(500, "application/json", b'{"error":"Internal server error"}')
+            return
+
+        # Each encoding is a separate representation with its own tag
+        compressed = gzipped is not None and accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        if compressed:
+            body, etag = gzipped, etag[:-1] + '-gz"'
+        if etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self._send(304, content_type, b"", etag, compressed)
+            return
+        self._send(200, content_type, body, etag, compressed)
+
+    def _send(self, status, content_type, body, etag=None, compressed=False):
+        """
+        Write a response with the caching and encoding headers.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Access logs are not kept; errors are logged in do_GET
+        pass
+
+
+class PooledHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    An HTTP server that gives each connection its own thread and runs the
+    database and rendering work on a fixed-size thread pool, so idle
+    keep-alive connections don't hold pool workers.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, service, workers=16):
+        """
+        :param address: Tuple (host, port) to listen on.
+        :param service: WeatherService answering the requests.
+        :param workers: Number of worker threads for database and rendering work.
+        """
+        super().__init__(address, WeatherRequestHandler)
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._active_lock:
+            self._active.add(request)
+        super().process_request(request, client_address)
+
+    def shutdown_request(self, request):
+        with self._active_lock:
+            self._active.discard(request)
+        super().shutdown_request(request)
+
+    def server_close(self):
+        # Wake connection threads blocked on idle keep-alive connections
+        with self._active_lock:
+            for request in self._active:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def create_server(db_name="weather_data.db", host="127.0.0.1", port=8000, workers=16):
+    """
+    Create a server for the given database without starting it.
+    :return: PooledHTTPServer instance (call serve_forever() to start it).
+    """
+    service = WeatherService(db_name, pool_size=workers)
+    return PooledHTTPServer((host, port), service, workers)
+
+
+def main():
+    """
+    Run the service from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Read-only HTTP service for the weather database.")
+    parser.add_argument("--db", default="weather_data.db", help="SQLite database file")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=16, help="Worker threads and pooled connections")
+    args = parser.parse_args()
+
+    server = create_server(args.db, args.host, args.port, args.workers)
+    print(f"Serving {args.db} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ import plot_operations
 import weather_processor
 from datetime import datetime
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
 class WeatherApp:
     def __init__(self, root):
@@ -98,6 +98,12 @@ class WeatherApp:
                        value="boxplot", command=self.update_plot_inputs).grid(row=0, column=1, padx=5)
         ttk.Radiobutton(plot_type_frame, text="Monthly Line Plot", variable=self.plot_type, 
                        value="lineplot", command=self.update_plot_inputs).grid(row=0, column=2, padx=5)
+        ttk.Radiobutton(plot_type_frame, text="Anomaly Plot", variable=self.plot_type,
+                       value="anomaly", command=self.update_plot_inputs).grid(row=1, column=1, padx=5)
+        ttk.Radiobutton(plot_type_frame, text="Rolling Mean Plot", variable=self.plot_type,
+                       value="rolling", command=self.update_plot_inputs).grid(row=1, column=2, padx=5)
+        ttk.Radiobutton(plot_type_frame, text="Long-Range Line Plot", variable=self.plot_type,
+                       value="longrange", command=self.update_plot_inputs).grid(row=2, column=1, padx=5)
         
         # Input frame for plot parameters
         self.input_frame = ttk.Frame(plots_frame)
@@ -123,6 +129,16 @@ class WeatherApp:
         self.month_entry = ttk.Entry(self.lineplot_frame, width=10)
         self.month_entry.grid(row=0, column=3, padx=5)
         
+        # Long-range line plot inputs
+        self.longrange_frame = ttk.Frame(self.input_frame)
+        ttk.Label(self.longrange_frame, text="From (YYYY-MM-DD):").grid(row=0, column=0, padx=5)
+        self.range_start_entry = ttk.Entry(self.longrange_frame, width=12)
+        self.range_start_entry.grid(row=0, column=1, padx=5)
+        
+        ttk.Label(self.longrange_frame, text="To (YYYY-MM-DD):").grid(row=0, column=2, padx=5)
+        self.range_end_entry = ttk.Entry(self.longrange_frame, width=12)
+        self.range_end_entry.grid(row=0, column=3, padx=5)
+        
         # Generate button
         ttk.Button(plots_frame, text="Generate Plot", command=self.generate_plot).pack(pady=5)
         
@@ -137,10 +153,13 @@ class WeatherApp:
         # Hide all input frames
         self.boxplot_frame.pack_forget()
         self.lineplot_frame.pack_forget()
+        self.longrange_frame.pack_forget()
         
         # Show the appropriate input frame
-        if self.plot_type.get() == "boxplot":
+        if self.plot_type.get() in ("boxplot", "anomaly", "rolling"):
             self.boxplot_frame.pack(fill=tk.X, pady=5)
+        elif self.plot_type.get() == "longrange":
+            self.longrange_frame.pack(fill=tk.X, pady=5)
         else:
             self.lineplot_frame.pack(fill=tk.X, pady=5)
     
@@ -190,6 +209,18 @@ class WeatherApp:
                 start_year = int(self.start_year_entry.get())
                 end_year = int(self.end_year_entry.get())
                 plot_ops.generate_year_to_year_boxplot(start_year, end_year)
+            elif plot_type == "anomaly":
+                start_year = int(self.start_year_entry.get())
+                end_year = int(self.end_year_entry.get())
+                plot_ops.generate_anomaly_plot(start_year, end_year, self.db.fetch_normals())
+            elif plot_type == "rolling":
+                start_year = int(self.start_year_entry.get())
+                end_year = int(self.end_year_entry.get())
+                plot_ops.generate_rolling_mean_plot(start_year, end_year)
+            elif plot_type == "longrange":
+                start_date = self.range_start_entry.get().strip() or None
+                end_date = self.range_end_entry.get().strip() or None
+                plot_ops.generate_longrange_lineplot(start_date, end_date)
             else:  # lineplot
                 year = int(self.year_entry.get())
                 month = int(self.month_entry.get())
@@ -198,7 +229,13 @@ class WeatherApp:
             # Embed the plot in the UI
             canvas = FigureCanvasTkAgg(plt.gcf(), master=self.plot_frame)
             canvas.draw()
+            
+            # Toolbar for zooming and panning; long-range plots re-decimate on zoom
+            toolbar = NavigationToolbar2Tk(canvas, self.plot_frame, pack_toolbar=False)
+            toolbar.update()
+            toolbar.pack(side=tk.BOTTOM, fill=tk.X)
             canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+            self.plot_ops = plot_ops  # keep the zoom callbacks alive with the plot
             
             self.status_label.config(text="Plot generated successfully")
         except Exception as e: